@@ -0,0 +1,179 @@
+"""Shared helpers for the ICS2000 cover and switch platforms."""
+from __future__ import annotations
+
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Any
+from ics2000.Core import Hub
+from ics2000.Devices import Device
+
+from homeassistant.const import CONF_PASSWORD, CONF_MAC, CONF_EMAIL, EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant
+from homeassistant.helpers.typing import ConfigType
+
+_LOGGER = logging.getLogger(__name__)
+
+# Gedeelde pool voor het versturen van commando's naar de hub
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='kaku')
+
+# Actie die per device wordt uitgevoerd, met een event om die actie af te breken en
+# of de actie al naar de hub is verstuurd. Gedeeld door alle entities van een device,
+# ook over cover en switch heen.
+_BUSY: dict[Any, tuple[Enum, threading.Event, bool]] = {}
+_BUSY_LOCK = threading.Lock()
+
+# Verbonden hubs met hun devices, zodat cover en switch maar een keer inloggen.
+# Het wachtwoord zit in de sleutel, zodat een platform met andere credentials zelf inlogt.
+_HUBS: dict[tuple[str, str, str], tuple[Hub, list[Device]]] = {}
+_HUBS_LOCK = threading.Lock()
+
+# Of de stop listener die de pool afsluit al is geregistreerd
+_STOP_LISTENER_REGISTERED = False
+
+
+def _shutdown(event: Event) -> None:
+    """Cancel running actions and stop the pool when Home Assistant stops."""
+    with _BUSY_LOCK:
+        for _, cancel, _ in _BUSY.values():
+            cancel.set()
+        _BUSY.clear()
+    _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+
+def _register_shutdown(hass: HomeAssistant) -> None:
+    """Register _shutdown for EVENT_HOMEASSISTANT_STOP, once per process."""
+    global _STOP_LISTENER_REGISTERED
+    with _HUBS_LOCK:
+        if not _STOP_LISTENER_REGISTERED:
+            hass.bus.listen_once(EVENT_HOMEASSISTANT_STOP, _shutdown)
+            _STOP_LISTENER_REGISTERED = True
+
+
+def get_hub(mac: str, email: str, password: str) -> tuple[Hub, list[Device]] | None:
+    """Return a connected hub and its devices, or None if the hub can not be reached."""
+    key = (mac, email, password)
+    with _HUBS_LOCK:
+        cached = _HUBS.get(key)
+        if cached is None:
+            hub = Hub(mac, email, password)
+            if not hub.connected:
+                return None
+            cached = _HUBS[key] = (hub, list(hub.devices))
+        return cached
+
+
+def setup_devices(hass: HomeAssistant, config: ConfigType, ids_key: str) -> list[Device]:
+    """Return the hub devices whose id is listed under ids_key in the platform config."""
+    if not config.get(ids_key):
+        return []
+
+    connection = get_hub(
+        config[CONF_MAC],
+        config[CONF_EMAIL],
+        config[CONF_PASSWORD]
+    )
+
+    if connection is None:
+        _LOGGER.error("Could not connect to ICS2000 hub")
+        return []
+    _, devices = connection
+
+    _register_shutdown(hass)
+
+    # Debug: Print alle devices met hun IDs
+    if _LOGGER.isEnabledFor(logging.INFO):
+        _LOGGER.info("ICS2000 devices found: %s", [(d.id, d.name, type(d).__name__) for d in devices])
+
+    device_ids = frozenset(config[ids_key])
+    return [device for device in devices if str(device.id) in device_ids]
+
+
+class KakuEntityMixin:
+    """Busy tracking and thread-safe state writes for KlikAanKlikUit entities."""
+
+    # Cancel event van de laatste actie die deze entity heeft gestart
+    _cancel: threading.Event | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Remember the event loop so worker threads can write the state."""
+        await super().async_added_to_hass()
+        self._loop = self.hass.loop
+        self.async_on_remove(self._cancel_pending)
+
+    def _cancel_pending(self) -> None:
+        """Cancel the running action of this entity when it is removed."""
+        if self._cancel is not None:
+            self._cancel.set()
+            self._release(self._cancel)
+            self._cancel = None
+
+    def _write_state(self) -> None:
+        """Write the current state to Home Assistant from any thread."""
+        self._loop.call_soon_threadsafe(self.async_write_ha_state)
+
+    def _submit(self, cancel: threading.Event, fn, *args) -> bool:
+        """Submit work to the pool, or release the device if the pool has been shut down."""
+        try:
+            _EXECUTOR.submit(fn, *args)
+        except RuntimeError:
+            _LOGGER.warning('Could not start action for %s, the pool has been shut down', self._id)
+            self._release(cancel)
+            return False
+        return True
+
+    def _claim(self, action: Enum) -> threading.Event | None:
+        """Mark this device as busy and return the cancel event for the action.
+
+        Returns None if the same action is already running. A different running
+        action is cancelled in favour of the new one.
+        """
+        with _BUSY_LOCK:
+            running = _BUSY.get(self._id)
+            if running is not None:
+                if running[0] is action:
+                    _LOGGER.info('Action %s already running for %s, ignoring request', action.name, self._id)
+                    return None
+                _LOGGER.info('Cancelling action %s for %s', running[0].name, self._id)
+                running[1].set()
+            cancel = self._cancel = threading.Event()
+            _BUSY[self._id] = (action, cancel, False)
+            return cancel
+
+    def _start(self, cancel: threading.Event) -> bool:
+        """Mark the action as sent to the hub, or return False if it was cancelled."""
+        with _BUSY_LOCK:
+            if cancel.is_set():
+                return False
+            running = _BUSY.get(self._id)
+            if running is not None and running[1] is cancel:
+                _BUSY[self._id] = (running[0], cancel, True)
+            return True
+
+    def _cancel_unsent(self, *actions: Enum) -> Enum | None:
+        """Cancel the running action if it is one of actions and has not been sent to the hub yet.
+
+        Returns the cancelled action, or None if nothing was cancelled.
+        """
+        with _BUSY_LOCK:
+            running = _BUSY.get(self._id)
+            if running is None or running[2] or running[0] not in actions:
+                return None
+            _LOGGER.info('Cancelling action %s for %s before it was sent', running[0].name, self._id)
+            running[1].set()
+            del _BUSY[self._id]
+            return running[0]
+
+    def _release(self, cancel: threading.Event) -> bool:
+        """Mark this device as idle again, unless a newer action took over.
+
+        Returns True if the action still owned the device.
+        """
+        with _BUSY_LOCK:
+            running = _BUSY.get(self._id)
+            if running is not None and running[1] is cancel:
+                del _BUSY[self._id]
+                return True
+            return False
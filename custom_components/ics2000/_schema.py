@@ -0,0 +1,42 @@
+"""Configuration schema and validators shared by the ICS2000 platforms."""
+from __future__ import annotations
+
+import re
+import voluptuous as vol
+
+from typing import Any, Callable
+
+import homeassistant.helpers.config_validation as cv
+from homeassistant.const import CONF_PASSWORD, CONF_MAC, CONF_EMAIL, CONF_IP_ADDRESS
+
+_IP_RE = re.compile(r'[1-9][0-9]{0,2}(\.(0|[1-9][0-9]{0,2})){2}\.[1-9][0-9]{0,2}')
+_AES_RE = re.compile(r'[a-zA-Z0-9]{32}')
+
+
+def _fullmatch(regex: re.Pattern) -> Callable[[Any], str]:
+    """Return a validator that checks a string fully matches a precompiled regex."""
+
+    def validator(value: Any) -> str:
+        if not isinstance(value, str):
+            raise vol.Invalid(f'not a string value: {value}')
+        if not regex.fullmatch(value):
+            raise vol.Invalid(f'value {value} does not match regular expression {regex.pattern}')
+        return value
+
+    return validator
+
+
+ip_address = _fullmatch(_IP_RE)
+aes_key = _fullmatch(_AES_RE)
+device_ids = vol.All(cv.ensure_list, [cv.string])
+
+# Validation of the user's configuration, gedeeld door alle platforms
+PLATFORM_SCHEMA_EXTRA = {
+    vol.Required(CONF_MAC): cv.string,
+    vol.Required(CONF_EMAIL): cv.string,
+    vol.Required(CONF_PASSWORD): cv.string,
+    vol.Optional('tries'): cv.positive_int,
+    vol.Optional('sleep'): cv.positive_int,
+    vol.Optional(CONF_IP_ADDRESS): ip_address,
+    vol.Optional('aes'): aes_key,
+}
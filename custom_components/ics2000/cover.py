@@ -6,30 +6,24 @@ import threading
 import voluptuous as vol
 
 from typing import Any
-from ics2000.Core import Hub
 from ics2000.Devices import Device
-from enum import Enum
+from enum import IntEnum
 
-import homeassistant.helpers.config_validation as cv
 from homeassistant.components.cover import PLATFORM_SCHEMA, CoverEntity, CoverDeviceClass
-from homeassistant.const import CONF_PASSWORD, CONF_MAC, CONF_EMAIL, CONF_IP_ADDRESS
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 
+from ._kaku_common import KakuEntityMixin, setup_devices
+from ._schema import PLATFORM_SCHEMA_EXTRA, device_ids
+
 _LOGGER = logging.getLogger(__name__)
 
 
 # Validation of the user's configuration
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
-    vol.Required(CONF_MAC): cv.string,
-    vol.Required(CONF_EMAIL): cv.string,
-    vol.Required(CONF_PASSWORD): cv.string,
-    vol.Optional('tries'): cv.positive_int,
-    vol.Optional('sleep'): cv.positive_int,
-    vol.Optional(CONF_IP_ADDRESS): cv.matches_regex(r'[1-9][0-9]{0,2}(\.(0|[1-9][0-9]{0,2})){2}\.[1-9][0-9]{0,2}'),
-    vol.Optional('aes'): cv.matches_regex(r'[a-zA-Z0-9]{32}'),
-    vol.Optional('cover_devices'): vol.All(cv.ensure_list, [cv.string])  # Device IDs die covers zijn
+    **PLATFORM_SCHEMA_EXTRA,
+    vol.Optional('cover_devices'): device_ids  # Device IDs die covers zijn
 })
 
 
@@ -40,67 +34,53 @@ def setup_platform(
         discovery_info: DiscoveryInfoType | None = None
 ) -> None:
     """Set up the ICS2000 Cover platform."""
-    hub = Hub(
-        config[CONF_MAC],
-        config[CONF_EMAIL],
-        config[CONF_PASSWORD]
-    )
-
-    if not hub.connected:
-        _LOGGER.error("Could not connect to ICS2000 hub")
-        return
-
-    # Debug: Print alle devices met hun IDs
-    _LOGGER.info("=== ICS2000 COVER DEVICES FOUND ===")
-    for device in hub.devices:
-        _LOGGER.info(f"Device ID: {device.id}, Name: {device.name}, Type: {type(device).__name__}")
-    _LOGGER.info("=== END COVER DEVICE LIST ===")
-
-    # Alleen devices toevoegen die als covers zijn geconfigureerd
-    cover_device_ids = config.get('cover_devices', [])
-    cover_devices = [device for device in hub.devices if str(device.id) in cover_device_ids]
-    
+    tries = int(config.get('tries', 1))
+    sleep = int(config.get('sleep', 3))
+
     entities = []
-    for device in cover_devices:
-        _LOGGER.info(f"Adding cover device {device.name}")
+    for device in setup_devices(hass, config, 'cover_devices'):
+        _LOGGER.info("Adding cover device %s", device.name)
         entities.append(KlikAanKlikUitCover(
             device=device,
-            tries=int(config.get('tries', 1)),
-            sleep=int(config.get('sleep', 3))
+            tries=tries,
+            sleep=sleep
         ))
 
     add_entities(entities)
 
 
-class KlikAanKlikUitCoverAction(Enum):
-    OPEN = 'open'
-    CLOSE = 'close'
-    STOP = 'stop'
+class KlikAanKlikUitCoverAction(IntEnum):
+    OPEN = 0
+    CLOSE = 1
+    STOP = 2
 
 
-class KlikAanKlikUitCoverThread(threading.Thread):
+class KlikAanKlikUitCoverState(IntEnum):
+    UNKNOWN = 0
+    OPEN = 1
+    OPENING = 2
+    CLOSING = 3
+    CLOSED = 4
 
-    def __init__(self, action: KlikAanKlikUitCoverAction, device_id, target, kwargs):
-        super().__init__(
-            name=f'cover{action.value}{device_id}',
-            target=target,
-            kwargs=kwargs
-        )
 
-    @staticmethod
-    def has_running_threads(device_id) -> bool:
-        running_threads = [thread.name for thread in threading.enumerate() if thread.name in [
-            f'cover{KlikAanKlikUitCoverAction.OPEN.value}{device_id}',
-            f'cover{KlikAanKlikUitCoverAction.CLOSE.value}{device_id}',
-            f'cover{KlikAanKlikUitCoverAction.STOP.value}{device_id}'
-        ]]
-        if running_threads:
-            _LOGGER.info(f'Running cover threads: {",".join(running_threads)}')
-            return True
-        return False
+# Entity attributen per toestand: (is_closed, is_opening, is_closing, icon)
+_ATTRS_BY_STATE = {
+    KlikAanKlikUitCoverState.UNKNOWN: (None, False, False, 'mdi:window-shutter'),
+    KlikAanKlikUitCoverState.OPEN: (False, False, False, 'mdi:window-shutter'),
+    KlikAanKlikUitCoverState.OPENING: (False, True, False, 'mdi:arrow-up-bold'),
+    KlikAanKlikUitCoverState.CLOSING: (True, False, True, 'mdi:arrow-down-bold'),
+    KlikAanKlikUitCoverState.CLOSED: (True, False, False, 'mdi:window-shutter'),
+}
 
+# Toestand na afloop van een actie, het scherm blijft bewegen tot een stop en daarna is de positie onbekend
+_POST_STATE = {
+    KlikAanKlikUitCoverAction.OPEN: KlikAanKlikUitCoverState.OPENING,
+    KlikAanKlikUitCoverAction.CLOSE: KlikAanKlikUitCoverState.CLOSING,
+    KlikAanKlikUitCoverAction.STOP: KlikAanKlikUitCoverState.UNKNOWN,
+}
 
-class KlikAanKlikUitCover(CoverEntity):
+
+class KlikAanKlikUitCover(KakuEntityMixin, CoverEntity):
     """Representation of a KlikAanKlikUit cover (zonnescherm)"""
 
     def __init__(self, device: Device, tries: int, sleep: int) -> None:
@@ -110,173 +90,137 @@ class KlikAanKlikUitCover(CoverEntity):
         self._name = device.name
         self._id = device.id
         self._hub = device.hub
-        self._is_closed = None
-        self._is_opening = False
-        self._is_closing = False
         self.unique_id = f'kaku-cover-{device.id}'
+        self._attr_name = device.name
         self._attr_device_class = CoverDeviceClass.AWNING
-        
-        _LOGGER.info(f'Adding cover with name {self._name}')
-
-    @property
-    def name(self) -> str:
-        """Return the display name of this cover."""
-        return self._name
-
-    @property
-    def is_closed(self) -> bool | None:
-        """Return if the cover is closed."""
-        return self._is_closed
-
-    @property
-    def is_opening(self) -> bool:
-        """Return if the cover is opening."""
-        return self._is_opening
-
-    @property
-    def is_closing(self) -> bool:
-        """Return if the cover is closing."""
-        return self._is_closing
-
-    @property
-    def icon(self) -> str:
-        """Return icon for the cover."""
-        if self._is_opening:
-            return "mdi:arrow-up-bold"
-        elif self._is_closing:
-            return "mdi:arrow-down-bold"
-        else:
-            return "mdi:window-shutter"
+        self._set_state(KlikAanKlikUitCoverState.UNKNOWN)
+
+        _LOGGER.info('Adding cover with name %s', self._name)
 
-    def open_cover(self, **kwargs: Any) -> None:
+    def _set_state(self, state: KlikAanKlikUitCoverState) -> None:
+        """Set the state and the entity attributes Home Assistant reads from it."""
+        self._cover_state = state
+        self._attr_is_closed, self._attr_is_opening, self._attr_is_closing, self._attr_icon = _ATTRS_BY_STATE[state]
+
+    async def async_open_cover(self, **kwargs: Any) -> None:
         """Open the cover (omhoog)."""
-        _LOGGER.info(f'Opening cover {self._name}')
+        _LOGGER.info('Opening cover %s', self._name)
         
-        if KlikAanKlikUitCoverThread.has_running_threads(self._id):
-            _LOGGER.info(f'Thread already running for cover {self._id}, ignoring request')
+        action = KlikAanKlikUitCoverAction.OPEN
+        cancel = self._claim(action)
+        if cancel is None:
             return
 
-        self._is_opening = True
-        self._is_closing = False
-        self.schedule_update_ha_state()
-        
-        KlikAanKlikUitCoverThread(
-            action=KlikAanKlikUitCoverAction.OPEN,
-            device_id=self._id,
-            target=self._execute_cover_action,
-            kwargs={
-                'action': 'open'
-            }
-        ).start()
-
-    def close_cover(self, **kwargs: Any) -> None:
+        if not self._submit(cancel, self._execute_cover_action, action, self._do_open, cancel):
+            return
+
+        self._set_state(KlikAanKlikUitCoverState.OPENING)
+        self.async_write_ha_state()
+
+    async def async_close_cover(self, **kwargs: Any) -> None:
         """Close the cover (omlaag)."""
-        _LOGGER.info(f'Closing cover {self._name}')
+        _LOGGER.info('Closing cover %s', self._name)
         
-        if KlikAanKlikUitCoverThread.has_running_threads(self._id):
-            _LOGGER.info(f'Thread already running for cover {self._id}, ignoring request')
+        action = KlikAanKlikUitCoverAction.CLOSE
+        cancel = self._claim(action)
+        if cancel is None:
             return
 
-        self._is_closing = True
-        self._is_opening = False
-        self.schedule_update_ha_state()
-        
-        KlikAanKlikUitCoverThread(
-            action=KlikAanKlikUitCoverAction.CLOSE,
-            device_id=self._id,
-            target=self._execute_cover_action,
-            kwargs={
-                'action': 'close'
-            }
-        ).start()
-
-    def stop_cover(self, **kwargs: Any) -> None:
+        if not self._submit(cancel, self._execute_cover_action, action, self._do_close, cancel):
+            return
+
+        self._set_state(KlikAanKlikUitCoverState.CLOSING)
+        self.async_write_ha_state()
+
+    async def async_stop_cover(self, **kwargs: Any) -> None:
         """Stop the cover movement."""
-        _LOGGER.info(f'Stopping cover {self._name}')
-        
+        _LOGGER.info('Stopping cover %s', self._name)
+
+        # Een beweging die nog niet naar de hub is gestuurd hoeft niet gestopt te worden,
+        # een stop signaal zou het scherm dan juist laten bewegen
+        if self._cancel_unsent(KlikAanKlikUitCoverAction.OPEN, KlikAanKlikUitCoverAction.CLOSE) is not None:
+            self._set_state(KlikAanKlikUitCoverState.UNKNOWN)
+            self.async_write_ha_state()
+            return
+
         # Voor KlikAanKlikUit: stop door hetzelfde signaal nogmaals te sturen
         # We forceren altijd een stop actie, ongeacht de status
-        if self._is_opening:
+        if self._cover_state is KlikAanKlikUitCoverState.OPENING:
             # Als het omhoog gaat, stuur turn_on nogmaals om te stoppen
-            hub_function = self._hub.turn_on
-            stop_action = 'stop_opening'
-            _LOGGER.info(f'Stopping upward movement')
-        elif self._is_closing:
+            work = self._do_stop_up
+            _LOGGER.info('Stopping upward movement')
+        elif self._cover_state is KlikAanKlikUitCoverState.CLOSING:
             # Als het omlaag gaat, stuur turn_off nogmaals om te stoppen
-            hub_function = self._hub.turn_off
-            stop_action = 'stop_closing'
-            _LOGGER.info(f'Stopping downward movement')
+            work = self._do_stop_down
+            _LOGGER.info('Stopping downward movement')
         else:
             # Zelfs als we denken dat het gestopt is, probeer beide stop signalen
-            _LOGGER.info(f'Cover status unknown, trying both stop signals')
-            # Probeer eerst turn_on (voor het geval het omhoog ging)
-            try:
-                self._hub.turn_on(entity=self._id)
-            except:
-                pass
-            # Dan turn_off (voor het geval het omlaag ging)
-            try:
-                self._hub.turn_off(entity=self._id)
-            except:
-                pass
-            # Reset status
-            self._is_opening = False
-            self._is_closing = False
-            self._is_closed = None
-            self.schedule_update_ha_state()
+            work = self._do_stop_both
+            _LOGGER.info('Cover status unknown, trying both stop signals')
+
+        cancel = self._claim(KlikAanKlikUitCoverAction.STOP)
+        if cancel is None:
             return
-        
-        KlikAanKlikUitCoverThread(
-            action=KlikAanKlikUitCoverAction.STOP,
-            device_id=self._id,
-            target=self._execute_cover_action,
-            kwargs={
-                'action': stop_action,
-                'hub_function': hub_function
-            }
-        ).start()
-
-    def _execute_cover_action(self, action: str, hub_function=None):
-        """Execute cover action."""
+
+        self._submit(cancel, self._execute_cover_action, KlikAanKlikUitCoverAction.STOP, work, cancel)
+
+    def _do_open(self) -> None:
+        """Zonnescherm omhoog (turn_on)."""
+        # NIET meteen status resetten - blijf OPENING
+        self._hub.turn_on(entity=self._id)
+
+    def _do_close(self) -> None:
+        """Zonnescherm omlaag (turn_off)."""
+        # NIET meteen status resetten - blijf CLOSING
+        self._hub.turn_off(entity=self._id)
+
+    def _do_stop_up(self) -> None:
+        """Stop omhoog beweging door turn_on nogmaals te sturen."""
+        self._hub.turn_on(entity=self._id)
+
+    def _do_stop_down(self) -> None:
+        """Stop omlaag beweging door turn_off nogmaals te sturen."""
+        self._hub.turn_off(entity=self._id)
+
+    def _do_stop_both(self) -> None:
+        """Stuur beide stop signalen als de richting onbekend is."""
+        # Probeer eerst turn_on (voor het geval het omhoog ging)
+        try:
+            self._hub.turn_on(entity=self._id)
+        except Exception:
+            pass
+        # Dan turn_off (voor het geval het omlaag ging)
+        try:
+            self._hub.turn_off(entity=self._id)
+        except Exception:
+            pass
+
+    def _execute_cover_action(self, action: KlikAanKlikUitCoverAction, work, cancel: threading.Event) -> None:
+        """Execute one of the _do_* cover actions on a pool thread."""
+        if not self._start(cancel):
+            _LOGGER.info('Cover action %s for %s was cancelled before it started', action.name, self._name)
+            self._release(cancel)
+            return
+
         try:
-            _LOGGER.info(f'Executing cover action {action} for {self._name}')
-            
-            if action == 'open':
-                # Zonnescherm omhoog (turn_on)
-                self._hub.turn_on(entity=self._id)
-                # NIET meteen status resetten - blijf _is_opening = True
-                self._is_closed = False
-                self.schedule_update_ha_state()
-                return  # Exit vroeg, geen finally blok
-                
-            elif action == 'close':
-                # Zonnescherm omlaag (turn_off)
-                self._hub.turn_off(entity=self._id)
-                # NIET meteen status resetten - blijf _is_closing = True
-                self._is_closed = True
-                self.schedule_update_ha_state()
-                return  # Exit vroeg, geen finally blok
-                
-            elif action == 'stop_opening' and hub_function:
-                # Stop omhoog beweging door turn_on nogmaals te sturen
-                _LOGGER.info(f'Stopping upward movement by sending turn_on again')
-                hub_function(entity=self._id)
-                
-            elif action == 'stop_closing' and hub_function:
-                # Stop omlaag beweging door turn_off nogmaals te sturen  
-                _LOGGER.info(f'Stopping downward movement by sending turn_off again')
-                hub_function(entity=self._id)
-                
+            _LOGGER.info('Executing cover action %s for %s', action.name, self._name)
+            work()
         except Exception as e:
-            _LOGGER.error(f'Error executing cover action {action} for {self._name}: {e}')
+            _LOGGER.error('Error executing cover action %s for %s: %s', action.name, self._name, e)
         finally:
-            # Alleen voor stop acties: reset states
-            if action.startswith('stop'):
-                self._is_opening = False
-                self._is_closing = False
-                self._is_closed = None  # Onbekende positie na stop
-                self.schedule_update_ha_state()
-                _LOGGER.info(f'Cover action {action} completed for {self._name}')
+            self._loop.call_soon_threadsafe(self._finish_action, action, cancel)
+            _LOGGER.info('Cover action %s completed for %s', action.name, self._name)
+
+    @callback
+    def _finish_action(self, action: KlikAanKlikUitCoverAction, cancel: threading.Event) -> None:
+        """Apply the state after an action, unless a newer action was started in the meantime.
+
+        Runs on the event loop like the cover services, so no press can slip in
+        between the ownership check and the state write.
+        """
+        if self._release(cancel):
+            self._set_state(_POST_STATE[action])
+            self.async_write_ha_state()
 
     def update(self) -> None:
         """Update cover state."""
@@ -13,13 +13,14 @@ from ics2000.Devices import Device, Dimmer
 from enum import Enum
 
 # Import the device class from the component that you want to support
-import homeassistant.helpers.config_validation as cv
 from homeassistant.components.light import ATTR_BRIGHTNESS, PLATFORM_SCHEMA, LightEntity, ColorMode
-from homeassistant.const import CONF_PASSWORD, CONF_MAC, CONF_EMAIL,CONF_IP_ADDRESS
+from homeassistant.const import CONF_PASSWORD, CONF_MAC, CONF_EMAIL
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 
+from ._schema import PLATFORM_SCHEMA_EXTRA, device_ids
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -34,15 +35,9 @@ def repeat(tries: int, sleep: int, callable_function, **kwargs):
 
 # Validation of the user's configuration
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
-    vol.Required(CONF_MAC): cv.string,
-    vol.Required(CONF_EMAIL): cv.string,
-    vol.Required(CONF_PASSWORD): cv.string,
-    vol.Optional('tries'): cv.positive_int,
-    vol.Optional('sleep'): cv.positive_int,
-    vol.Optional(CONF_IP_ADDRESS): cv.matches_regex(r'[1-9][0-9]{0,2}(\.(0|[1-9][0-9]{0,2})){2}\.[1-9][0-9]{0,2}'),
-    vol.Optional('aes'): cv.matches_regex(r'[a-zA-Z0-9]{32}'),
+    **PLATFORM_SCHEMA_EXTRA,
     # Nieuwe optie voor zonnescherm devices
-    vol.Optional('awning_devices'): vol.All(cv.ensure_list, [cv.string])  # Device IDs die zonneschermen zijn
+    vol.Optional('awning_devices'): device_ids  # Device IDs die zonneschermen zijn
 })
 
 
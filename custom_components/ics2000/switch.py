@@ -1,45 +1,30 @@
 """Platform for switch integration (zonneschermen)."""
 from __future__ import annotations
 
+import asyncio
 import logging
-import time
 import threading
 import voluptuous as vol
 
 from typing import Any
-from ics2000.Core import Hub
 from ics2000.Devices import Device
 from enum import Enum
 
-import homeassistant.helpers.config_validation as cv
 from homeassistant.components.switch import PLATFORM_SCHEMA, SwitchEntity
-from homeassistant.const import CONF_PASSWORD, CONF_MAC, CONF_EMAIL, CONF_IP_ADDRESS
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 
-_LOGGER = logging.getLogger(__name__)
-
+from ._kaku_common import KakuEntityMixin, setup_devices
+from ._schema import PLATFORM_SCHEMA_EXTRA, device_ids
 
-def repeat(tries: int, sleep: int, callable_function, **kwargs):
-    _LOGGER.info(f'Function repeat called in thread {threading.current_thread().name}')
-    qualname = getattr(callable_function, '__qualname__')
-    for i in range(0, tries):
-        _LOGGER.info(f'Try {i + 1} of {tries} on {qualname}')
-        callable_function(**kwargs)
-        time.sleep(sleep if i != tries - 1 else 0)
+_LOGGER = logging.getLogger(__name__)
 
 
 # Validation of the user's configuration
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
-    vol.Required(CONF_MAC): cv.string,
-    vol.Required(CONF_EMAIL): cv.string,
-    vol.Required(CONF_PASSWORD): cv.string,
-    vol.Optional('tries'): cv.positive_int,
-    vol.Optional('sleep'): cv.positive_int,
-    vol.Optional(CONF_IP_ADDRESS): cv.matches_regex(r'[1-9][0-9]{0,2}(\.(0|[1-9][0-9]{0,2})){2}\.[1-9][0-9]{0,2}'),
-    vol.Optional('aes'): cv.matches_regex(r'[a-zA-Z0-9]{32}'),
-    vol.Optional('awning_devices'): vol.All(cv.ensure_list, [cv.string])  # Device IDs die zonneschermen zijn
+    **PLATFORM_SCHEMA_EXTRA,
+    vol.Optional('awning_devices'): device_ids  # Device IDs die zonneschermen zijn
 })
 
 
@@ -50,41 +35,25 @@ def setup_platform(
         discovery_info: DiscoveryInfoType | None = None
 ) -> None:
     """Set up the ICS2000 Switch platform."""
-    hub = Hub(
-        config[CONF_MAC],
-        config[CONF_EMAIL],
-        config[CONF_PASSWORD]
-    )
-
-    if not hub.connected:
-        _LOGGER.error("Could not connect to ICS2000 hub")
-        return
-
-    # Debug: Print alle devices met hun IDs
-    _LOGGER.info("=== ICS2000 SWITCH DEVICES FOUND ===")
-    for device in hub.devices:
-        _LOGGER.info(f"Device ID: {device.id}, Name: {device.name}, Type: {type(device).__name__}")
-    _LOGGER.info("=== END SWITCH DEVICE LIST ===")
+    tries = int(config.get('tries', 1))
+    sleep = int(config.get('sleep', 3))
 
     entities = []
-    awning_device_ids = config.get('awning_devices', [])
-    
-    for device in hub.devices:
-        if str(device.id) in awning_device_ids:
-            # Voeg zonnescherm toe als twee aparte momentary switches
-            _LOGGER.info(f"Adding awning device {device.name} as two momentary switches")
-            entities.append(KlikAanKlikUitAwningSwitch(
-                device=device,
-                tries=int(config.get('tries', 1)),
-                sleep=int(config.get('sleep', 3)),
-                direction='up'
-            ))
-            entities.append(KlikAanKlikUitAwningSwitch(
-                device=device,
-                tries=int(config.get('tries', 1)),
-                sleep=int(config.get('sleep', 3)),
-                direction='down'
-            ))
+    for device in setup_devices(hass, config, 'awning_devices'):
+        # Voeg zonnescherm toe als twee aparte momentary switches
+        _LOGGER.info("Adding awning device %s as two momentary switches", device.name)
+        entities.append(KlikAanKlikUitAwningSwitch(
+            device=device,
+            tries=tries,
+            sleep=sleep,
+            direction='up'
+        ))
+        entities.append(KlikAanKlikUitAwningSwitch(
+            device=device,
+            tries=tries,
+            sleep=sleep,
+            direction='down'
+        ))
 
     add_entities(entities)
 
@@ -94,30 +63,12 @@ class KlikAanKlikUitAwningAction(Enum):
     DOWN = 'down'
 
 
-class KlikAanKlikUitAwningThread(threading.Thread):
-
-    def __init__(self, action: KlikAanKlikUitAwningAction, device_id, target, kwargs):
-        super().__init__(
-            name=f'awning{action.value}{device_id}',
-            target=target,
-            kwargs=kwargs
-        )
-
-    @staticmethod
-    def has_running_threads(device_id) -> bool:
-        running_threads = [thread.name for thread in threading.enumerate() if thread.name in [
-            f'awning{KlikAanKlikUitAwningAction.UP.value}{device_id}',
-            f'awning{KlikAanKlikUitAwningAction.DOWN.value}{device_id}'
-        ]]
-        if running_threads:
-            _LOGGER.info(f'Running awning threads: {",".join(running_threads)}')
-            return True
-        return False
-
-
-class KlikAanKlikUitAwningSwitch(SwitchEntity):
+class KlikAanKlikUitAwningSwitch(KakuEntityMixin, SwitchEntity):
     """Representation of a KlikAanKlikUit awning switch (momentary)"""
 
+    # Timer die de switch na een beweging weer uitschakelt
+    _off_timer: asyncio.TimerHandle | None = None
+
     def __init__(self, device: Device, tries: int, sleep: int, direction: str) -> None:
         """Initialize a KlikAanKlikUitAwningSwitch"""
         self.tries = tries
@@ -128,14 +79,18 @@ class KlikAanKlikUitAwningSwitch(SwitchEntity):
         self._hub = device.hub
         self._is_on = False
         self.unique_id = f'kaku-awning-{device.id}-{direction}'
-        
-        # Icons voor duidelijkheid
+
+        # Bepaal welke hub functie te gebruiken, en icons voor duidelijkheid
         if direction == 'up':
+            self._hub_function = self._hub.turn_on
+            self._action = KlikAanKlikUitAwningAction.UP
             self._attr_icon = 'mdi:arrow-up-bold'
         else:
+            self._hub_function = self._hub.turn_off
+            self._action = KlikAanKlikUitAwningAction.DOWN
             self._attr_icon = 'mdi:arrow-down-bold'
             
-        _LOGGER.info(f'Adding awning switch with name {self._name}')
+        _LOGGER.info('Adding awning switch with name %s', self._name)
 
     @property
     def name(self) -> str:
@@ -152,66 +107,96 @@ class KlikAanKlikUitAwningSwitch(SwitchEntity):
         """Return the icon for this switch."""
         return self._attr_icon
 
-    def turn_on(self, **kwargs: Any) -> None:
+    async def async_turn_on(self, **kwargs: Any) -> None:
         """Activate the awning movement."""
-        _LOGGER.info(f'Activating awning {self._name} in thread {threading.current_thread().name}')
-        
-        # Check if er al een thread actief is voor dit device
-        if KlikAanKlikUitAwningThread.has_running_threads(self._id):
-            _LOGGER.info(f'Thread already running for device {self._id}, ignoring request')
+        _LOGGER.info('Activating awning %s', self._name)
+
+        # Check of er al een beweging actief is voor dit device
+        cancel = self._claim(self._action)
+        if cancel is None:
             return
-        
-        # Bepaal welke hub functie te gebruiken
-        if self.direction == 'up':
-            hub_function = self._hub.turn_on
-            action = KlikAanKlikUitAwningAction.UP
-        else:
-            hub_function = self._hub.turn_off
-            action = KlikAanKlikUitAwningAction.DOWN
-        
-        # Start beweging in aparte thread
-        KlikAanKlikUitAwningThread(
-            action=action,
-            device_id=self._id,
-            target=self._execute_movement,
-            kwargs={
-                'hub_function': hub_function
-            }
-        ).start()
-
-    def turn_off(self, **kwargs: Any) -> None:
+
+        # Een uitschakeltimer van de vorige beweging mag deze beweging niet uitschakelen
+        self._cancel_off_timer()
+
+        # Start beweging in de gedeelde pool
+        self._submit(cancel, self._execute_movement, cancel)
+
+    async def async_turn_off(self, **kwargs: Any) -> None:
         """Switch automatically turns off (momentary behavior)."""
-        _LOGGER.info(f'Deactivating awning {self._name}')
+        _LOGGER.info('Deactivating awning %s', self._name)
         self._is_on = False
-        self.schedule_update_ha_state()
+        self.async_write_ha_state()
 
-    def _execute_movement(self, hub_function):
-        """Execute the movement and auto-turn off."""
+    def _execute_movement(self, cancel: threading.Event, attempt: int = 0):
+        """Send one try of the movement and schedule the next try, or auto-turn off."""
         try:
-            _LOGGER.info(f'Executing movement for {self._name}')
-            
-            # Schakel aan voor visuele feedback
-            self._is_on = True
-            self.schedule_update_ha_state()
-            
-            # Voer beweging uit met repeat functie
-            repeat(
-                tries=self.tries,
-                sleep=self.sleep,
-                callable_function=hub_function,
-                entity=self._id
-            )
-            
-            # Wacht kort en schakel automatisch uit (momentary gedrag)
-            time.sleep(0.5)
-            
+            if attempt == 0:
+                _LOGGER.info('Executing movement for %s', self._name)
+                # Schakel aan voor visuele feedback
+                self._is_on = True
+                self._write_state()
+
+            if not self._start(cancel):
+                _LOGGER.info('Cancelled movement for %s after %s of %s tries', self._name, attempt, self.tries)
+            else:
+                _LOGGER.info('Try %s of %s on %s', attempt + 1, self.tries, self._hub_function.__qualname__)
+                self._hub_function(entity=self._id)
+
+                if attempt + 1 < self.tries:
+                    # Wacht op de event loop in plaats van in deze thread en stuur dan de volgende poging
+                    self._loop.call_soon_threadsafe(
+                        self._loop.call_later, self.sleep, self._next_try, cancel, attempt + 1
+                    )
+                    return
+
         except Exception as e:
-            _LOGGER.error(f'Error executing awning movement for {self._name}: {e}')
-        finally:
-            # Altijd uitschakelen na actie
-            self._is_on = False
-            self.schedule_update_ha_state()
-            _LOGGER.info(f'Movement completed for {self._name}')
+            _LOGGER.error('Error executing awning movement for %s: %s', self._name, e)
+
+        # Altijd kort daarna uitschakelen (momentary gedrag), de wachttijd loopt op de event loop
+        self._loop.call_soon_threadsafe(self._finish_movement, cancel)
+        _LOGGER.info('Movement completed for %s', self._name)
+
+    @callback
+    def _next_try(self, cancel: threading.Event, attempt: int) -> None:
+        """Submit the next try of a movement, or finish right away if it was cancelled."""
+        if cancel.is_set():
+            _LOGGER.info('Cancelled movement for %s after %s of %s tries', self._name, attempt, self.tries)
+            self._release(cancel)
+            self._finish_momentary()
+            return
+        if not self._submit(cancel, self._execute_movement, cancel, attempt):
+            self._finish_momentary()
+
+    @callback
+    def _finish_movement(self, cancel: threading.Event) -> None:
+        """Release the device and schedule the switch to turn off again.
+
+        Runs on the event loop like async_turn_on, so a new press either sees
+        the device busy or cancels this timer.
+        """
+        self._release(cancel)
+        self._cancel_off_timer()
+        self._off_timer = self._loop.call_later(0.5, self._finish_momentary)
+
+    @callback
+    def _cancel_off_timer(self) -> None:
+        """Cancel a pending turn off."""
+        if self._off_timer is not None:
+            self._off_timer.cancel()
+            self._off_timer = None
+
+    def _cancel_pending(self) -> None:
+        """Cancel the running movement and the pending turn off when the switch is removed."""
+        super()._cancel_pending()
+        self._cancel_off_timer()
+
+    @callback
+    def _finish_momentary(self) -> None:
+        """Turn the switch off again after a movement."""
+        self._off_timer = None
+        self._is_on = False
+        self.async_write_ha_state()
 
     def update(self) -> None:
         """Update switch state."""